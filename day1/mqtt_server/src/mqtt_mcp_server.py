@@ -6,10 +6,12 @@ This MCP server connects to an MQTT broker and exposes UNS data to Claude Deskto
 through tools for reading and writing MQTT topics.
 
 Architecture:
-    - On connect: Subscribe to all topics (#) and cache values in a JSON file
-    - On message: Update the cache file with the latest value for each topic
+    - On connect: Subscribe to all topics (#) and cache values in memory
+    - On message: Update the cache with the latest value for each topic
+    - Cache is periodically persisted to a JSON file and reloaded on startup
     - Cache persists across reconnections for stability
-    - Tools read from the cache file for instant responses
+    - Tools read from the in-memory cache for instant responses
+    - Network I/O runs on the asyncio event loop (no background thread)
 
 Tools:
     - list_uns_topics: List all cached topics and their values
@@ -19,14 +21,18 @@ Tools:
 """
 
 import asyncio
+import functools
+import heapq
 import json
 import logging
+import math
 import os
 import sys
 import time
 import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 import fnmatch
 import re
 import threading
@@ -57,17 +63,159 @@ MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
 MQTT_USERNAME = os.getenv("MQTT_USERNAME", "")
 MQTT_PASSWORD = os.getenv("MQTT_PASSWORD", "")
 
+# Payloads are decoded and cached up to this many bytes (tools display far less)
+MQTT_MAX_PAYLOAD_BYTES = int(os.getenv("MQTT_MAX_PAYLOAD_BYTES", "4096"))
+
 # Generate unique client ID to prevent collisions
 # Use base from env + unique suffix to allow multiple instances
 _base_client_id = os.getenv("MQTT_CLIENT_ID", "mcp-mqtt")
 MQTT_CLIENT_ID = f"{_base_client_id}-{uuid.uuid4().hex[:8]}"
 
+# Reconnection backoff (seconds) and housekeeping interval for the network loop
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 120
+MISC_LOOP_INTERVAL = 1.0
+
 # Cache file configuration
 CACHE_FILE = Path(__file__).parent / "mqtt_cache.json"
+CACHE_FLUSH_INTERVAL = 5.0  # Seconds between cache file writes while messages arrive
+CACHE_STATS_INTERVAL = 10000  # Log cache size every N messages
+
+# Topic listings show at most this many topics (alphabetically first)
+MAX_DISPLAY_TOPICS = 1000
+
+# Upper bound on how long get_topic_value waits for a topic's first message
+MAX_TOPIC_WAIT = 30.0
+
+# Least recently updated topics are evicted beyond this many cached topics
+MQTT_MAX_TOPICS = int(os.getenv("MQTT_MAX_TOPICS", "50000"))
+
+# Human-readable MQTT connect/disconnect reason codes (MQTT 3.1.1 and 5.0)
+_REASON_MAP: dict[int, str] = {
+    0: "Normal disconnection",
+    1: "Incorrect protocol version",
+    2: "Invalid client identifier",
+    3: "Server unavailable",
+    4: "Bad username or password",
+    5: "Not authorized",
+    7: "Unexpected disconnect (no DISCONNECT packet)",
+    16: "Normal disconnection",
+    128: "Unspecified error",
+    129: "Malformed packet",
+    130: "Protocol error",
+    131: "Implementation specific error",
+    132: "Unsupported protocol version",
+    133: "Client identifier not valid",
+    134: "Bad username or password",
+    135: "Not authorized",
+    136: "Server unavailable",
+    137: "Server busy",
+    138: "Banned",
+    139: "Server shutting down",
+    140: "Bad authentication method",
+    141: "Keep alive timeout",
+    142: "Session taken over",  # Another client with same ID connected
+    143: "Topic filter invalid",
+    144: "Topic name invalid",
+    147: "Receive maximum exceeded",
+    148: "Topic alias invalid",
+    149: "Packet too large",
+    150: "Message rate too high",
+    151: "Quota exceeded",
+    152: "Administrative action",
+    153: "Payload format invalid",
+    154: "Retain not supported",
+    155: "QoS not supported",
+    156: "Use another server",
+    157: "Server moved",
+    158: "Shared subscriptions not supported",
+    159: "Connection rate exceeded",
+    160: "Maximum connect time",
+    161: "Subscription identifiers not supported",
+    162: "Wildcard subscriptions not supported",
+}
+
+
+def _decode_payload(raw: bytes) -> tuple[str, bool]:
+    """
+    Decode a message payload for the cache, capped at MQTT_MAX_PAYLOAD_BYTES.
+
+    Returns the decoded text and whether it was truncated. Payloads that
+    are not valid UTF-8 are stored as hex.
+    """
+    truncated = len(raw) > MQTT_MAX_PAYLOAD_BYTES
+    if truncated:
+        raw = raw[:MQTT_MAX_PAYLOAD_BYTES]
+
+    try:
+        return raw.decode("utf-8"), truncated
+    except UnicodeDecodeError as e:
+        # The cap may have split a multi-byte character at the end
+        if truncated and e.reason == "unexpected end of data":
+            return raw[:e.start].decode("utf-8"), truncated
+        return raw.hex(), truncated
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_mqtt_pattern(pattern: str) -> re.Pattern:
+    """
+    Compile an MQTT topic filter into a regex matching full topic names.
+
+    '+' matches exactly one topic level, and '#' (only valid as the last
+    level) matches the parent level and everything below it, so 'a/#'
+    matches 'a' and 'a/b/c'. Everything else matches literally.
+    """
+    levels = pattern.split("/")
+    parts = []
+    for i, level in enumerate(levels):
+        if level == "#" and i == len(levels) - 1:
+            if not parts:
+                return re.compile(".*", re.DOTALL)
+            return re.compile(re.escape("/").join(parts) + r"(?:/.*)?\Z", re.DOTALL)
+        parts.append("[^/]*" if level == "+" else re.escape(level))
+    return re.compile(re.escape("/").join(parts) + r"\Z")
+
+
+def _build_topic_filter(pattern: str) -> Callable[[str], bool]:
+    """
+    Build a topic predicate for a search pattern, compiled once per search.
+
+    Supports MQTT wildcards (+, #), glob wildcards (*, ?) and plain
+    case-insensitive keywords.
+    """
+    # Handle MQTT wildcards (+ and #)
+    if "+" in pattern or "#" in pattern:
+        return _compile_mqtt_pattern(pattern).match
+
+    # Handle glob wildcards (* and ?)
+    if "*" in pattern or "?" in pattern:
+        return re.compile(fnmatch.translate(f"*{pattern}*")).match
+
+    # Simple case-insensitive keyword search
+    keyword = pattern.lower()
+    return lambda topic: keyword in topic.lower()
+
+
+class CacheEntry:
+    """Cached value of a single topic, updated in place as new messages arrive."""
+
+    # Slots avoid a per-instance __dict__, keeping large caches compact
+    __slots__ = ("value", "timestamp", "truncated", "generation")
+
+    def __init__(self, value: str, timestamp: float, truncated: bool = False, generation: int = 0):
+        self.value = value
+        self.timestamp = timestamp
+        self.truncated = truncated
+        self.generation = generation
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "CacheEntry":
+        """Create an entry from its cache file representation."""
+        return cls(data.get("value", ""), data.get("timestamp", 0), data.get("truncated", False))
 
 
 class MQTTClientWrapper:
-    """Wrapper class for MQTT client with file-based caching."""
+    """Wrapper class for MQTT client with an in-memory, file-backed cache."""
 
     def __init__(self):
         """Initialize MQTT client with v2.0+ API."""
@@ -79,107 +227,152 @@ class MQTTClientWrapper:
         )
         self.connected = False
         self._reconnect_count = 0
-        self._cache_lock = threading.Lock()  # Thread-safe file access
         self._message_count = 0
 
+        # Live topic cache: topic -> CacheEntry
+        # Ordered from least to most recently updated, bounded by MQTT_MAX_TOPICS
+        self.messages: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_future: asyncio.Future | None = None
+
+        # Bumped on every successful (re)connect; entries record the generation
+        # they were last updated in, so stale values are detectable without
+        # clearing the cache
+        self.generation = 0
+
+        # Event loop integration state (set up in connect())
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._misc_handle: asyncio.TimerHandle | None = None
+        self._connect_future: asyncio.Future | None = None
+        self._connect_lock = asyncio.Lock()  # One connect() at a time
+        self._reconnect_delay = RECONNECT_MIN_DELAY
+        self._next_reconnect = 0.0
+        self._connecting = False  # A connect/reconnect is running in the executor
+        self._stopping = False
+
+        # Callers waiting for a topic's first message (resolved in _on_message)
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+
+        # QoS > 0 publishes awaiting broker acknowledgement, by message ID
+        self._publish_waiters: dict[int, asyncio.Future] = {}
+
         # Set up callbacks
         self.client.on_connect = self._on_connect
         self.client.on_disconnect = self._on_disconnect
         self.client.on_message = self._on_message
+        self.client.on_publish = self._on_publish
+
+        # Socket callbacks hand paho's network I/O to the asyncio event loop
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
 
         # Set credentials if provided
         if MQTT_USERNAME and MQTT_PASSWORD:
             self.client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
 
-        # Configure reconnection with exponential backoff
-        # min_delay=1s, max_delay=120s - prevents rapid reconnection cycling
-        self.client.reconnect_delay_set(min_delay=1, max_delay=120)
-
-        # Initialize cache file (create if doesn't exist, preserve if exists)
-        self._init_cache()
-
-    def _init_cache(self):
-        """Initialize cache file if it doesn't exist (preserves existing cache)."""
-        with self._cache_lock:
-            try:
-                if not CACHE_FILE.exists():
-                    with open(CACHE_FILE, 'w') as f:
-                        json.dump({}, f)
-                    logger.info(f"Created new cache file: {CACHE_FILE}")
-                else:
-                    # Load existing cache to get topic count
-                    try:
-                        with open(CACHE_FILE, 'r') as f:
-                            cache = json.load(f)
-                        logger.info(f"Loaded existing cache with {len(cache)} topics")
-                    except (json.JSONDecodeError, Exception):
-                        # If corrupted, start fresh
-                        with open(CACHE_FILE, 'w') as f:
-                            json.dump({}, f)
-                        logger.warning("Cache file was corrupted, starting fresh")
-            except Exception as e:
-                logger.error(f"Failed to initialize cache file: {e}")
+        # Load cache file (create if doesn't exist, preserve if exists)
+        self._load_cache()
 
-    def _clear_cache(self):
-        """Clear the cache file (write empty JSON object)."""
-        with self._cache_lock:
-            try:
-                with open(CACHE_FILE, 'w') as f:
-                    json.dump({}, f)
-                logger.debug(f"Cache file cleared: {CACHE_FILE}")
-            except Exception as e:
-                logger.error(f"Failed to clear cache file: {e}")
-
-    def _read_cache(self) -> dict[str, Any]:
-        """Read the current cache from file."""
-        with self._cache_lock:
-            try:
-                if CACHE_FILE.exists():
+    def _load_cache(self):
+        """Load the cache file into memory, creating it if it doesn't exist."""
+        try:
+            if not CACHE_FILE.exists():
+                self._write_cache_file([])
+                logger.info(f"Created new cache file: {CACHE_FILE}")
+            else:
+                try:
+                    # Loaded values predate this process's connections (generation 0)
                     with open(CACHE_FILE, 'r') as f:
-                        return json.load(f)
-            except json.JSONDecodeError:
-                logger.warning("Cache file corrupted, returning empty cache")
-            except Exception as e:
-                logger.error(f"Failed to read cache file: {e}")
-            return {}
+                        self.messages = OrderedDict(
+                            (topic, CacheEntry.from_dict(data)) for topic, data in json.load(f).items()
+                        )
+                    while len(self.messages) > MQTT_MAX_TOPICS:
+                        self.messages.popitem(last=False)
+                    logger.info(f"Loaded existing cache with {len(self.messages)} topics")
+                except (json.JSONDecodeError, Exception):
+                    # If corrupted, start fresh
+                    self.messages = OrderedDict()
+                    self._write_cache_file([])
+                    logger.warning("Cache file was corrupted, starting fresh")
+        except Exception as e:
+            logger.error(f"Failed to initialize cache file: {e}")
 
-    def _write_to_cache(self, topic: str, value: str):
-        """Write/update a single topic value in the cache file."""
-        with self._cache_lock:
-            try:
-                # Read existing cache
-                cache = {}
-                if CACHE_FILE.exists():
-                    try:
-                        with open(CACHE_FILE, 'r') as f:
-                            cache = json.load(f)
-                    except (json.JSONDecodeError, Exception):
-                        cache = {}
-
-                # Update the topic value
-                cache[topic] = {
-                    "value": value,
-                    "timestamp": time.time(),
-                }
-
-                # Write back atomically (write to temp, then rename)
-                temp_file = CACHE_FILE.with_suffix('.tmp')
-                with open(temp_file, 'w') as f:
-                    json.dump(cache, f)
-                temp_file.replace(CACHE_FILE)
+    def _clear_cache(self):
+        """Clear the cache (the cache file is emptied on the next flush)."""
+        self.messages.clear()
+        self._schedule_flush()
+        logger.debug("Cache cleared")
 
-            except Exception as e:
-                logger.error(f"Failed to write to cache file: {e}")
+    def _write_cache_file(self, snapshot: list[tuple[str, str, float, bool]]):
+        """Encode a cache snapshot (see _snapshot_cache) and write it to the cache file."""
+        try:
+            data = json.dumps({
+                topic: {"value": value, "timestamp": timestamp, "truncated": truncated}
+                for topic, value, timestamp, truncated in snapshot
+            })
+            # Write atomically (write to temp, then rename)
+            temp_file = CACHE_FILE.with_suffix('.tmp')
+            with open(temp_file, 'w') as f:
+                f.write(data)
+            temp_file.replace(CACHE_FILE)
+        except Exception as e:
+            logger.error(f"Failed to write cache file: {e}")
+
+    def _snapshot_cache(self) -> list[tuple[str, str, float, bool]]:
+        """Copy the cache into plain tuples, cheap enough to run on the event loop."""
+        # Entries are updated in place, so the worker can't encode them directly
+        return [(topic, entry.value, entry.timestamp, entry.truncated) for topic, entry in self.messages.items()]
+
+    def _schedule_flush(self):
+        """Persist the cache after CACHE_FLUSH_INTERVAL, coalescing bursts of updates."""
+        if self._flush_handle is None and self._loop is not None:
+            self._flush_handle = self._loop.call_later(CACHE_FLUSH_INTERVAL, self._flush_cache)
+
+    def _flush_cache(self):
+        """Snapshot the cache on the event loop and write it to disk in a worker thread."""
+        self._flush_handle = None
+
+        # Only one write is ever in flight, so the cache file needs no lock
+        if self._flush_future is not None and not self._flush_future.done():
+            self._schedule_flush()
+            return
+
+        # JSON encoding of a large cache is slow, so it happens in the worker too
+        snapshot = self._snapshot_cache()
+        self._flush_future = self._loop.run_in_executor(None, self._write_cache_file, snapshot)
+
+    def _update_cache(self, topic: str, value: str, truncated: bool = False) -> CacheEntry:
+        """Update a single topic value in the cache."""
+        entry = self.messages.get(topic)
+        if entry is None:
+            entry = CacheEntry(value, time.time(), truncated, self.generation)
+            self.messages[topic] = entry
+            if len(self.messages) > MQTT_MAX_TOPICS:
+                self.messages.popitem(last=False)
+        else:
+            # Update known topics in place - no allocation per message
+            entry.value = value
+            entry.timestamp = time.time()
+            entry.truncated = truncated
+            entry.generation = self.generation
+            self.messages.move_to_end(topic)
+        self._schedule_flush()
+        return entry
 
     def _on_connect(self, client, userdata, flags, reason_code, properties):
         """Callback for when the client connects to the broker."""
         if reason_code == 0 or (isinstance(reason_code, ReasonCode) and reason_code.is_failure is False):
             self.connected = True
+            self.generation += 1
             if self._reconnect_count > 0:
                 logger.info(f"Reconnected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT} (attempt {self._reconnect_count})")
             else:
                 logger.info(f"Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
             self._reconnect_count = 0
+            self._reconnect_delay = RECONNECT_MIN_DELAY
 
             # Subscribe to all topics to populate cache
             result, mid = self.client.subscribe("#", qos=1)
@@ -187,10 +380,16 @@ class MQTTClientWrapper:
                 logger.info("Subscribed to all topics (#) for caching")
             else:
                 logger.error(f"Failed to subscribe to all topics: {result}")
+
+            if self._connect_future is not None and not self._connect_future.done():
+                self._connect_future.set_result(True)
         else:
             reason_str = self._get_reason_string(reason_code)
             logger.error(f"Connection failed: {reason_str}")
 
+            if self._connect_future is not None and not self._connect_future.done():
+                self._connect_future.set_result(False)
+
     def _on_disconnect(self, client, userdata, flags, reason_code, properties):
         """Callback for when the client disconnects from the broker."""
         self.connected = False
@@ -203,7 +402,7 @@ class MQTTClientWrapper:
 
         # Only log as warning for unexpected disconnects
         # Normal disconnection (rc=0) or client-initiated are expected
-        if reason_code == 0 or reason_str == "Normal disconnection":
+        if self._stopping or reason_code == 0 or reason_str == "Normal disconnection":
             logger.info(f"Disconnected from MQTT broker: {reason_str}")
         else:
             logger.warning(f"Disconnected from MQTT broker: {reason_str} (will auto-reconnect, cache preserved)")
@@ -215,118 +414,223 @@ class MQTTClientWrapper:
             return str(reason_code)
 
         # Handle integer reason codes (MQTT 3.1.1 style)
-        reason_map = {
-            0: "Normal disconnection",
-            1: "Incorrect protocol version",
-            2: "Invalid client identifier",
-            3: "Server unavailable",
-            4: "Bad username or password",
-            5: "Not authorized",
-            7: "Unexpected disconnect (no DISCONNECT packet)",
-            16: "Normal disconnection",
-            128: "Unspecified error",
-            129: "Malformed packet",
-            130: "Protocol error",
-            131: "Implementation specific error",
-            132: "Unsupported protocol version",
-            133: "Client identifier not valid",
-            134: "Bad username or password",
-            135: "Not authorized",
-            136: "Server unavailable",
-            137: "Server busy",
-            138: "Banned",
-            139: "Server shutting down",
-            140: "Bad authentication method",
-            141: "Keep alive timeout",
-            142: "Session taken over",  # Another client with same ID connected
-            143: "Topic filter invalid",
-            144: "Topic name invalid",
-            147: "Receive maximum exceeded",
-            148: "Topic alias invalid",
-            149: "Packet too large",
-            150: "Message rate too high",
-            151: "Quota exceeded",
-            152: "Administrative action",
-            153: "Payload format invalid",
-            154: "Retain not supported",
-            155: "QoS not supported",
-            156: "Use another server",
-            157: "Server moved",
-            158: "Shared subscriptions not supported",
-            159: "Connection rate exceeded",
-            160: "Maximum connect time",
-            161: "Subscription identifiers not supported",
-            162: "Wildcard subscriptions not supported",
-        }
-        return reason_map.get(int(reason_code) if reason_code else 0, f"Unknown ({reason_code})")
+        return _REASON_MAP.get(int(reason_code) if reason_code else 0, f"Unknown ({reason_code})")
 
     def _on_message(self, client, userdata, message):
-        """Callback for when a message is received - updates cache file."""
-        try:
-            payload = message.payload.decode("utf-8")
-        except UnicodeDecodeError:
-            payload = str(message.payload)
+        """Callback for when a message is received - updates the cache."""
+        payload, truncated = _decode_payload(message.payload)
 
-        # Update the cache file with this topic's value
-        self._write_to_cache(message.topic, payload)
+        # Update the cache with this topic's value
+        entry = self._update_cache(message.topic, payload, truncated)
         self._message_count += 1
-
-        logger.debug(f"Cached message on {message.topic}: {payload[:100]}")
-
-    def connect(self):
-        """Connect to the MQTT broker."""
+        if self._message_count % CACHE_STATS_INTERVAL == 0:
+            logger.info(f"Cache holds {len(self.messages)} topics ({self._message_count} messages received)")
+
+        # Wake any callers waiting for this topic
+        for fut in self._waiters.pop(message.topic, ()):
+            if not fut.done():
+                fut.set_result(entry)
+
+        # Guarded and %-formatted so nothing is formatted unless DEBUG is enabled
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cached message on %s: %s", message.topic, payload[:100])
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        """Callback for when a publish completes (PUBACK/PUBCOMP for QoS > 0)."""
+        fut = self._publish_waiters.pop(mid, None)
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+
+    def _call_in_loop(self, callback, *args):
+        """Run callback on the event loop, marshalling it over from worker threads."""
+        if threading.get_ident() == self._loop_thread_id:
+            callback(*args)
+        else:
+            # Socket callbacks fire on the executor thread while connecting
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    def _watch_socket(self, add_watcher, sock, callback):
+        """Register sock with the event loop, unless it was closed before the loop got here."""
+        if sock.fileno() != -1:
+            add_watcher(sock.fileno(), callback)
+
+    def _on_socket_open(self, client, userdata, sock):
+        """Callback for when the socket opens - watch it for incoming data."""
+        self._call_in_loop(self._watch_socket, self._loop.add_reader, sock, client.loop_read)
+
+    def _on_socket_close(self, client, userdata, sock):
+        """Callback for when the socket is about to close - stop watching it."""
+        # Capture the descriptor now; the socket is closed once this returns
+        fd = sock.fileno()
+        self._call_in_loop(self._loop.remove_reader, fd)
+        self._call_in_loop(self._loop.remove_writer, fd)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        """Callback for when paho has outgoing data - write once the socket is ready."""
+        self._call_in_loop(self._watch_socket, self._loop.add_writer, sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        """Callback for when the outgoing queue is drained."""
+        fd = sock.fileno()
+        if fd != -1:
+            self._call_in_loop(self._loop.remove_writer, fd)
+
+    def _misc_loop(self):
+        """Periodic housekeeping: keepalive pings and reconnection with backoff."""
         try:
-            logger.info(f"Connecting to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}...")
-            logger.info(f"Using client ID: {MQTT_CLIENT_ID}")
-            logger.info(f"Cache file: {CACHE_FILE}")
+            if not self._connecting and self.client.loop_misc() == mqtt.MQTT_ERR_NO_CONN and not self._stopping:
+                self._try_reconnect()
+        except Exception:
+            logger.exception("Error in MQTT housekeeping loop")
+        finally:
+            # Always reschedule - this timer is the only keepalive/reconnect path
+            self._misc_handle = self._loop.call_later(MISC_LOOP_INTERVAL, self._misc_loop)
+
+    def _try_reconnect(self):
+        """Attempt a reconnect if the backoff delay has elapsed."""
+        now = time.monotonic()
+        if now < self._next_reconnect:
+            return
+
+        # Exponential backoff prevents rapid reconnection cycling
+        delay = self._reconnect_delay
+        self._next_reconnect = now + delay
+        self._reconnect_delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+        # DNS lookup and TCP connect block, so run them off the event loop
+        logger.info(f"Reconnecting to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}...")
+        self._connecting = True
+        if self._connect_future is None or self._connect_future.done():
+            self._connect_future = self._loop.create_future()
+        fut = self._loop.run_in_executor(None, self.client.reconnect)
+        fut.add_done_callback(lambda f: self._on_reconnect_done(f, delay))
+
+    def _on_reconnect_done(self, fut: asyncio.Future, delay: float):
+        """Completion callback for a reconnect attempt run in the executor."""
+        self._connecting = False
+        if not fut.cancelled() and fut.exception() is not None:
+            logger.warning(f"Reconnect failed: {fut.exception()} (retrying in {delay}s)")
+            # Release anyone in connect() waiting on this attempt
+            if self._connect_future is not None and not self._connect_future.done():
+                self._connect_future.set_result(False)
+
+    async def connect(self, timeout: float = 10.0) -> bool:
+        """
+        Connect to the MQTT broker.
 
-            # Connect with keepalive of 60 seconds
-            self.client.connect(MQTT_BROKER, MQTT_PORT, keepalive=60)
+        Only one connection attempt runs at a time: concurrent callers, and a
+        background reconnect already in flight, are waited on rather than
+        raced against the same paho client.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping = False
 
-            # Start the network loop in a background thread
-            # This handles reconnection automatically with the configured backoff
-            self.client.loop_start()
+        async with self._connect_lock:
+            if self.connected:
+                return True
 
-            # Wait for initial connection
-            timeout = 10
-            start = time.time()
-            while not self.connected and (time.time() - start) < timeout:
-                time.sleep(0.1)
+            try:
+                # Socket reads/writes are driven by the event loop via the socket
+                # callbacks; keepalive and reconnection run on a periodic timer.
+                # Start it first so a failed initial connect is still retried, and
+                # let it wait out the backoff delay before its first retry.
+                self._next_reconnect = time.monotonic() + self._reconnect_delay
+                if self._misc_handle is None:
+                    self._misc_handle = self._loop.call_later(MISC_LOOP_INTERVAL, self._misc_loop)
+
+                if self._connecting:
+                    # A background reconnect is in flight; wait for its outcome
+                    logger.info("Waiting for reconnect already in progress...")
+                else:
+                    logger.info(f"Connecting to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}...")
+                    logger.info(f"Using client ID: {MQTT_CLIENT_ID}")
+                    logger.info(f"Cache file: {CACHE_FILE}")
 
-            if not self.connected:
+                    self._connect_future = self._loop.create_future()
+                    self._connecting = True
+                    try:
+                        # Connect with keepalive of 60 seconds
+                        # DNS lookup and TCP connect block, so run them off the event loop
+                        await self._loop.run_in_executor(None, self.client.connect, MQTT_BROKER, MQTT_PORT, 60)
+                    except Exception:
+                        self._connect_future.set_result(False)
+                        raise
+                    finally:
+                        self._connecting = False
+
+                # Wait for the CONNACK to be handled in _on_connect; shielded so a
+                # timeout here doesn't cancel the future a later attempt resolves
+                return await asyncio.wait_for(asyncio.shield(self._connect_future), timeout)
+            except asyncio.TimeoutError:
                 logger.error("Failed to connect to MQTT broker within timeout")
                 return False
-            return True
-        except Exception as e:
-            logger.error(f"Failed to connect to MQTT broker: {e}")
-            return False
+            except Exception as e:
+                logger.error(f"Failed to connect to MQTT broker: {e}")
+                return False
 
-    def disconnect(self):
+    async def disconnect(self):
         """Disconnect from the MQTT broker (cache is preserved)."""
-        self.client.loop_stop()
+        self._stopping = True
+        if self._misc_handle is not None:
+            self._misc_handle.cancel()
+            self._misc_handle = None
+
         self.client.disconnect()
+        # Flush the DISCONNECT packet now - the event loop may not run again
+        self.client.loop_write()
+
         # Cache is preserved for stability across restarts
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_future is not None:
+            await self._flush_future
+        self._write_cache_file(self._snapshot_cache())
         logger.info("Disconnected from MQTT broker (cache preserved)")
 
-    def ensure_connected(self) -> bool:
+    async def ensure_connected(self) -> bool:
         """Ensure the client is connected, reconnecting if necessary."""
         if not self.connected:
-            return self.connect()
+            return await self.connect()
         return True
 
-    def get_all_topics(self) -> dict[str, Any]:
-        """Get all cached topics and their values."""
-        return self._read_cache()
+    def get_all_topics(self, topic_filter: Callable[[str], bool] | None = None) -> dict[str, CacheEntry]:
+        """Get all cached topics and their values, optionally only those matching topic_filter."""
+        if topic_filter is None:
+            return self.messages
+        return {topic: data for topic, data in self.messages.items() if topic_filter(topic)}
+
+    async def get_topic_value(self, topic: str, timeout: float = 5.0) -> CacheEntry | None:
+        """
+        Get a specific topic's cached value.
 
-    def get_topic_value(self, topic: str) -> dict[str, Any] | None:
-        """Get a specific topic's cached value."""
-        cache = self._read_cache()
-        return cache.get(topic)
+        Cached values are returned straight from the # subscription's cache,
+        even while disconnected. Only if the topic is not cached yet and the
+        client is connected, wait up to `timeout` seconds for its first
+        message to arrive (e.g. retained messages still streaming in right
+        after connecting).
+        """
+        cached = self.messages.get(topic)
+        if cached is not None or timeout <= 0 or not self.connected:
+            return cached
+
+        fut = self._loop.create_future()
+        self._waiters.setdefault(topic, []).append(fut)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(topic)
+            if waiters and fut in waiters:
+                waiters.remove(fut)
+                if not waiters:
+                    del self._waiters[topic]
 
     def get_topic_count(self) -> int:
         """Get the number of cached topics."""
-        cache = self._read_cache()
-        return len(cache)
+        return len(self.messages)
 
     async def publish_message(
         self,
@@ -347,7 +651,7 @@ class MQTTClientWrapper:
         Returns:
             Dictionary with publish result details
         """
-        if not self.ensure_connected():
+        if not await self.ensure_connected():
             raise ConnectionError("Not connected to MQTT broker")
 
         # Validate QoS
@@ -366,22 +670,7 @@ class MQTTClientWrapper:
         # Publish the message
         result = self.client.publish(topic, payload, qos=qos, retain=retain)
 
-        # Wait for publish to complete (for QoS > 0)
-        if qos > 0:
-            result.wait_for_publish(timeout=10)
-
-        if result.rc == mqtt.MQTT_ERR_SUCCESS:
-            logger.info(f"Successfully published to '{topic}'")
-            return {
-                "success": True,
-                "topic": topic,
-                "payload": payload,
-                "retain": retain,
-                "qos": qos,
-                "message_id": result.mid,
-                "timestamp": time.time(),
-            }
-        else:
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
             error_msg = f"Publish failed with error code: {result.rc}"
             logger.error(error_msg)
             return {
@@ -391,6 +680,32 @@ class MQTTClientWrapper:
                 "error_code": result.rc,
             }
 
+        # QoS 0 has no acknowledgement, so only QoS 1/2 wait for one
+        if qos > 0:
+            await self._wait_for_publish(result.mid, topic)
+
+        logger.info(f"Successfully published to '{topic}'")
+        return {
+            "success": True,
+            "topic": topic,
+            "payload": payload,
+            "retain": retain,
+            "qos": qos,
+            "message_id": result.mid,
+            "timestamp": time.time(),
+        }
+
+    async def _wait_for_publish(self, mid: int, topic: str, timeout: float = 10.0):
+        """Wait for the broker to acknowledge a QoS 1/2 publish (resolved by _on_publish)."""
+        fut = self._loop.create_future()
+        self._publish_waiters[mid] = fut
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Publish to '{topic}' not acknowledged within {timeout:.0f}s")
+        finally:
+            self._publish_waiters.pop(mid, None)
+
 
 # Create global MQTT client instance
 mqtt_client = MQTTClientWrapper()
@@ -423,6 +738,15 @@ async def list_tools() -> list[Tool]:
                         ),
                         "default": "#",
                     },
+                    "format": {
+                        "type": "string",
+                        "description": (
+                            "Output format: 'text' for a readable list (default) or 'json' for "
+                            "a JSON object of topics with their values and timestamps."
+                        ),
+                        "default": "text",
+                        "enum": ["text", "json"],
+                    },
                 },
                 "required": [],
             },
@@ -443,6 +767,14 @@ async def list_tools() -> list[Tool]:
                             "Full topic path to read, e.g., 'flexpack/packaging/line1/filler/speed'"
                         ),
                     },
+                    "timeout": {
+                        "type": "number",
+                        "description": (
+                            "Seconds to wait for a message if the topic is not cached yet. "
+                            f"Default is 5, maximum {MAX_TOPIC_WAIT:g}."
+                        ),
+                        "default": 5.0,
+                    },
                 },
                 "required": ["topic"],
             },
@@ -466,6 +798,15 @@ async def list_tools() -> list[Tool]:
                             "3) An MQTT wildcard pattern (e.g., 'flexpack/+/line1/#')"
                         ),
                     },
+                    "format": {
+                        "type": "string",
+                        "description": (
+                            "Output format: 'text' for a readable list (default) or 'json' for "
+                            "a JSON object of topics with their values and timestamps."
+                        ),
+                        "default": "text",
+                        "enum": ["text", "json"],
+                    },
                 },
                 "required": ["pattern"],
             },
@@ -522,77 +863,109 @@ async def list_tools() -> list[Tool]:
 @server.call_tool()
 async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
     """Handle tool calls."""
-
-    if name == "list_uns_topics":
-        return await handle_list_uns_topics(arguments)
-    elif name == "get_topic_value":
-        return await handle_get_topic_value(arguments)
-    elif name == "search_topics":
-        return await handle_search_topics(arguments)
-    elif name == "publish_message":
-        return await handle_publish_message(arguments)
-    else:
+    handler = _TOOL_HANDLERS.get(name)
+    if handler is None:
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
+    return await handler(arguments)
+
+
+def _display_items(topics: dict[str, CacheEntry]) -> list[tuple[str, CacheEntry]]:
+    """
+    Return the first MAX_DISPLAY_TOPICS topics in sorted order.
+
+    heapq.nsmallest avoids sorting the whole cache when it is much larger
+    than what gets displayed.
+    """
+    if len(topics) > MAX_DISPLAY_TOPICS:
+        return heapq.nsmallest(MAX_DISPLAY_TOPICS, topics.items())
+    return sorted(topics.items())
+
+
+def _truncate(value: str, limit: int) -> str:
+    """Shorten value to limit characters, marking the cut with '...'."""
+    return value if len(value) <= limit else value[:limit] + "..."
+
+
+def _format_topic_lines(topics: dict[str, CacheEntry]) -> str:
+    """Format topics as sorted '  • topic: value' lines, truncating long values for readability."""
+    text = "\n".join(
+        f"  • {topic_path}: {_truncate(entry.value, 100)}"
+        for topic_path, entry in _display_items(topics)
+    )
+    if len(topics) > MAX_DISPLAY_TOPICS:
+        text += f"\n  … and {len(topics) - MAX_DISPLAY_TOPICS} more (narrow the filter to see them)"
+    return text
+
+
+def _format_topics_json(topics: dict[str, CacheEntry]) -> str:
+    """Serialize topics as a single JSON document, with values capped at 200 characters."""
+    return json.dumps({
+        "total": len(topics),
+        "topics": {
+            topic_path: {
+                "value": entry.value[:200],
+                "timestamp": entry.timestamp,
+            }
+            for topic_path, entry in _display_items(topics)
+        },
+    })
+
+
+def _no_topics_result(output_format: str, message: str) -> list[TextContent]:
+    """Explain an empty topic listing, as prose or in the same shape as _format_topics_json."""
+    if output_format == "json":
+        message = json.dumps({"total": 0, "topics": {}, "error": message})
+    return [TextContent(type="text", text=message)]
 
 
 async def handle_list_uns_topics(arguments: dict[str, Any]) -> list[TextContent]:
     """
     List all cached topics from the UNS.
 
-    Reads from the cache file which is continuously updated
+    Reads from the in-memory cache which is continuously updated
     with live data from the MQTT broker.
     """
     base_path = arguments.get("base_path", "#")
+    output_format = arguments.get("format", "text")
 
     try:
         if not mqtt_client.connected:
-            return [
-                TextContent(
-                    type="text",
-                    text="Not connected to MQTT broker. Cache may be empty.",
-                )
-            ]
+            return _no_topics_result(
+                output_format,
+                "Not connected to MQTT broker. Cache may be empty.",
+            )
 
         all_topics = mqtt_client.get_all_topics()
 
         if not all_topics:
-            return [
-                TextContent(
-                    type="text",
-                    text="No topics in cache. The broker may have no retained messages, "
-                    "or the connection was just established (wait a moment for messages to arrive).",
-                )
-            ]
+            return _no_topics_result(
+                output_format,
+                "No topics in cache. The broker may have no retained messages, "
+                "or the connection was just established (wait a moment for messages to arrive).",
+            )
 
         # Filter by base_path if specified
         if base_path and base_path != "#":
+            prefix = base_path.rstrip('/')
             filtered_topics = {
                 k: v for k, v in all_topics.items()
-                if k.startswith(base_path.rstrip('/'))
+                if k.startswith(prefix)
             }
         else:
             filtered_topics = all_topics
 
         if not filtered_topics:
-            return [
-                TextContent(
-                    type="text",
-                    text=f"No topics found matching prefix '{base_path}'. "
-                    f"Total topics in cache: {len(all_topics)}",
-                )
-            ]
+            return _no_topics_result(
+                output_format,
+                f"No topics found matching prefix '{base_path}'. "
+                f"Total topics in cache: {len(all_topics)}",
+            )
 
         # Format the results
-        result_lines = [f"Found {len(filtered_topics)} topics:\n"]
-        for topic_path in sorted(filtered_topics.keys()):
-            data = filtered_topics[topic_path]
-            value = data.get("value", "")
-            # Truncate long values for readability
-            if len(value) > 100:
-                value = value[:100] + "..."
-            result_lines.append(f"  • {topic_path}: {value}")
-
-        return [TextContent(type="text", text="\n".join(result_lines))]
+        if output_format == "json":
+            return [TextContent(type="text", text=_format_topics_json(filtered_topics))]
+        header = f"Found {len(filtered_topics)} topics:\n\n"
+        return [TextContent(type="text", text=header + _format_topic_lines(filtered_topics))]
 
     except Exception as e:
         logger.exception("Error in list_uns_topics")
@@ -603,23 +976,33 @@ async def handle_get_topic_value(arguments: dict[str, Any]) -> list[TextContent]
     """
     Get the cached value for a specific topic.
 
-    Reads from the cache file for instant response.
+    Reads from the in-memory cache for instant response, even while
+    disconnected. Topics that have not published yet are waited on briefly
+    for their first message.
     """
     topic = arguments.get("topic")
+    timeout = arguments.get("timeout", 5.0)
     if not topic:
         return [TextContent(type="text", text="Error: 'topic' parameter is required")]
+    try:
+        timeout = float(timeout)
+    except (TypeError, ValueError):
+        timeout = math.nan
+    if math.isnan(timeout):
+        return [TextContent(type="text", text="Error: 'timeout' must be a number of seconds")]
+    timeout = min(timeout, MAX_TOPIC_WAIT)
 
     try:
-        if not mqtt_client.connected:
+        result = await mqtt_client.get_topic_value(topic, timeout=timeout)
+
+        if result is None and not mqtt_client.connected:
             return [
                 TextContent(
                     type="text",
-                    text="Not connected to MQTT broker. Cache may be stale.",
+                    text=f"Topic '{topic}' not found in cache and not connected to MQTT broker.",
                 )
             ]
 
-        result = mqtt_client.get_topic_value(topic)
-
         if result is None:
             # Check if we have any topics to give context
             topic_count = mqtt_client.get_topic_count()
@@ -633,15 +1016,21 @@ async def handle_get_topic_value(arguments: dict[str, Any]) -> list[TextContent]
             ]
 
         # Format the result
-        timestamp = result.get("timestamp", 0)
+        timestamp = result.timestamp
         age_seconds = time.time() - timestamp if timestamp else 0
 
         output = [
             f"Topic: {topic}",
-            f"Value: {result['value']}",
+            f"Value: {result.value}",
             f"Last updated: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}",
             f"Age: {age_seconds:.1f} seconds ago",
         ]
+        if result.truncated:
+            output.append(f"Note: payload truncated to the first {MQTT_MAX_PAYLOAD_BYTES} bytes")
+        if not mqtt_client.connected:
+            output.append("Note: not connected to MQTT broker, value may be stale")
+        elif result.generation < mqtt_client.generation:
+            output.append("Note: not updated since the last (re)connect to the broker, value may be stale")
 
         return [TextContent(type="text", text="\n".join(output))]
 
@@ -654,81 +1043,42 @@ async def handle_search_topics(arguments: dict[str, Any]) -> list[TextContent]:
     """
     Search cached topics matching a pattern or keyword.
 
-    Reads from the cache file and filters by pattern.
+    Reads from the in-memory cache and filters by pattern.
     """
     pattern = arguments.get("pattern")
+    output_format = arguments.get("format", "text")
     if not pattern:
         return [TextContent(type="text", text="Error: 'pattern' parameter is required")]
 
     try:
         if not mqtt_client.connected:
-            return [
-                TextContent(
-                    type="text",
-                    text="Not connected to MQTT broker. Cache may be empty.",
-                )
-            ]
-
-        all_topics = mqtt_client.get_all_topics()
-
-        if not all_topics:
-            return [
-                TextContent(
-                    type="text",
-                    text="No topics in cache to search through. "
-                    "The broker may have no retained messages.",
-                )
-            ]
-
-        # Filter topics by pattern
-        matching_topics = {}
-
-        # Determine if pattern contains wildcards
-        has_wildcards = any(c in pattern for c in ["*", "?", "+", "#"])
-
-        for topic_path, data in all_topics.items():
-            matched = False
-
-            if has_wildcards:
-                # Handle MQTT wildcards (+ and #)
-                if "+" in pattern or "#" in pattern:
-                    mqtt_pattern = pattern.replace("+", "[^/]+").replace("#", ".*")
-                    if re.match(f"^{mqtt_pattern}$", topic_path):
-                        matched = True
-                # Handle glob wildcards (* and ?)
-                else:
-                    if fnmatch.fnmatch(topic_path, f"*{pattern}*"):
-                        matched = True
-            else:
-                # Simple case-insensitive keyword search
-                if pattern.lower() in topic_path.lower():
-                    matched = True
+            return _no_topics_result(
+                output_format,
+                "Not connected to MQTT broker. Cache may be empty.",
+            )
 
-            if matched:
-                matching_topics[topic_path] = data
+        # Filter topics by pattern while reading the cache
+        matching_topics = mqtt_client.get_all_topics(_build_topic_filter(pattern))
 
         if not matching_topics:
-            return [
-                TextContent(
-                    type="text",
-                    text=f"No topics found matching pattern '{pattern}'. "
-                    f"Searched through {len(all_topics)} cached topics.",
+            topic_count = mqtt_client.get_topic_count()
+            if not topic_count:
+                return _no_topics_result(
+                    output_format,
+                    "No topics in cache to search through. "
+                    "The broker may have no retained messages.",
                 )
-            ]
+            return _no_topics_result(
+                output_format,
+                f"No topics found matching pattern '{pattern}'. "
+                f"Searched through {topic_count} cached topics.",
+            )
 
         # Format the results
-        result_lines = [
-            f"Found {len(matching_topics)} topics matching '{pattern}':\n"
-        ]
-        for topic_path in sorted(matching_topics.keys()):
-            data = matching_topics[topic_path]
-            value = data.get("value", "")
-            # Truncate long values for readability
-            if len(value) > 100:
-                value = value[:100] + "..."
-            result_lines.append(f"  • {topic_path}: {value}")
-
-        return [TextContent(type="text", text="\n".join(result_lines))]
+        if output_format == "json":
+            return [TextContent(type="text", text=_format_topics_json(matching_topics))]
+        header = f"Found {len(matching_topics)} topics matching '{pattern}':\n\n"
+        return [TextContent(type="text", text=header + _format_topic_lines(matching_topics))]
 
     except Exception as e:
         logger.exception("Error in search_topics")
@@ -796,6 +1146,15 @@ async def handle_publish_message(arguments: dict[str, Any]) -> list[TextContent]
         return [TextContent(type="text", text=f"Error publishing message: {e}")]
 
 
+# Tool name -> handler dispatch table used by call_tool
+_TOOL_HANDLERS = {
+    "list_uns_topics": handle_list_uns_topics,
+    "get_topic_value": handle_get_topic_value,
+    "search_topics": handle_search_topics,
+    "publish_message": handle_publish_message,
+}
+
+
 async def main():
     """Main entry point for the MCP server."""
     logger.info("Starting MQTT MCP Server...")
@@ -804,7 +1163,7 @@ async def main():
     logger.info(f"Cache file: {CACHE_FILE}")
 
     # Connect to MQTT broker
-    if not mqtt_client.connect():
+    if not await mqtt_client.connect():
         logger.error("Failed to connect to MQTT broker. Server will start but tools may fail.")
 
     try:
@@ -818,7 +1177,7 @@ async def main():
             )
     finally:
         # Clean up MQTT connection
-        mqtt_client.disconnect()
+        await mqtt_client.disconnect()
 
 
 if __name__ == "__main__":